@@ -1,5 +1,5 @@
 import os
-from flask import Flask
+from flask import Flask, request
 from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
 
@@ -14,17 +14,44 @@ def create_app():
     from app.config import Config
     app.secret_key = Config.SECRET_KEY
     
+    # Serialize JSON responses with orjson
+    from app.utils.json_utils import ORJSONProvider
+    app.json = ORJSONProvider(app)
+    
     # Configure ProxyFix for Replit environment
     app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
     
     app.config['UPLOAD_FOLDER'] = 'static/images'
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+    app.config['USE_X_SENDFILE'] = Config.USE_X_SENDFILE
+    
+    # Compress JSON and HTML responses
+    from flask_compress import Compress
+    app.config['COMPRESS_MIMETYPES'] = ['application/json', 'text/html']
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    app.config['COMPRESS_LEVEL'] = 4
+    Compress(app)
     
     # Ensure required directories exist
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     os.makedirs('data', exist_ok=True)
     os.makedirs('models', exist_ok=True)
     
+    # Write default base prices on first start so request handlers only ever read them
+    from app.models import BasePriceRepository
+    BasePriceRepository.bootstrap_base_prices()
+    
+    @app.after_request
+    def cache_uploaded_images(response):
+        """Mark uploaded property images as immutable so browsers skip revalidation"""
+        if (request.endpoint == 'static' and response.status_code in (200, 304)
+                and (request.view_args or {}).get('filename', '').startswith('images/')):
+            response.cache_control.no_cache = None
+            response.cache_control.public = True
+            response.cache_control.max_age = Config.UPLOAD_CACHE_MAX_AGE
+            response.cache_control.immutable = True
+        return response
+    
     # Register blueprints
     from app.blueprints.main import main_bp
     from app.blueprints.admin import admin_bp
@@ -34,4 +61,8 @@ def create_app():
     app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(api_bp, url_prefix='/api')
     
+    # Warm up the Gemini client so the first AI search does not pay the connection setup
+    from app.services.ai_service import warm_up_client
+    warm_up_client()
+    
     return app
\ No newline at end of file
@@ -1,25 +1,166 @@
 import uuid
 import os
+import hashlib
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from werkzeug.utils import secure_filename
 from app.models import PropertyRepository
 from app.services.ml_service import ml_service
-import re
+from app.utils.format_utils import NON_DIGITS
 
 def _parse_price(price_str):
-    """Parse price string with robust regex to remove all non-digits"""
+    """Parse price string by removing all non-digit characters"""
     if not price_str:
         return None
+    s = price_str if isinstance(price_str, str) else str(price_str)
+    cleaned = s.translate(NON_DIGITS)
+    if not cleaned.isascii():
+        # Rare: codepoints beyond Latin-1 survive the table, strip them explicitly
+        cleaned = "".join(c for c in cleaned if "0" <= c <= "9")
     try:
-        # Remove all non-digit characters using regex
-        cleaned = re.sub(r"[^0-9]", "", str(price_str))
         return int(cleaned) if cleaned else None
-    except (ValueError, AttributeError):
+    except ValueError:
+        # More digits than int() accepts: treat it as an invalid price
         return None
 
+_UPLOAD_CHUNK_SIZE = 1 << 20  # 1MB read/write buffer for image uploads
+
+_UPLOAD_MAX_WORKERS = 8
+
+_ZIP_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif'}
+
+@lru_cache(maxsize=1024)
+def _safe_filename(filename):
+    """secure_filename, memoized: camera names like IMG_0001.jpg repeat across uploads"""
+    return secure_filename(filename)
+
+def _save_upload(stream, filename, upload_folder):
+    """Stream an uploaded image to the upload folder under a content-hash name.
+    
+    Re-uploading identical bytes resolves to the same file, so it is not written twice.
+    Returns the stored filename.
+    """
+    ext = os.path.splitext(_safe_filename(filename))[1].lower()
+    tmp_path = os.path.join(upload_folder, f".{uuid.uuid4()}.part")
+    digest = hashlib.sha1()
+    try:
+        with open(tmp_path, 'wb', buffering=_UPLOAD_CHUNK_SIZE) as out:
+            while True:
+                chunk = stream.read(_UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+        image_filename = f"{digest.hexdigest()}{ext}"
+        final_path = os.path.join(upload_folder, image_filename)
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, final_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return image_filename
+
+def _save_uploads(files):
+    """Save several uploaded images concurrently, returning filenames in upload order"""
+    files = [file for file in files if file and file.filename]
+    upload_folder = _upload_folder
+    if len(files) <= 1:
+        return [_save_upload(file.stream, file.filename, upload_folder) for file in files]
+    # Disk writes and hashing release the GIL, so a small pool overlaps them
+    with ThreadPoolExecutor(max_workers=min(_UPLOAD_MAX_WORKERS, len(files))) as executor:
+        return list(executor.map(lambda file: _save_upload(file.stream, file.filename, upload_folder), files))
+
+def _open_image_zip(zip_file):
+    """Open an uploaded ZIP archive and check it before anything is saved.
+    
+    Returns (archive, image entries in name order); raises if the archive is
+    unreadable or its images exceed the upload limit.
+    """
+    archive = zipfile.ZipFile(zip_file.stream)
+    entries = [
+        info for info in archive.infolist()
+        if not info.is_dir() and os.path.splitext(info.filename)[1].lower() in _ZIP_IMAGE_EXTENSIONS
+    ]
+    # Guard against zip bombs: the declared uncompressed size must fit the upload limit
+    if sum(info.file_size for info in entries) > current_app.config['MAX_CONTENT_LENGTH']:
+        archive.close()
+        raise ValueError('ZIP contents exceed the maximum upload size')
+    return archive, sorted(entries, key=lambda info: info.filename)
+
+def _save_zip_uploads(archive, entries):
+    """Extract checked images from an opened ZIP archive, returning stored filenames"""
+    upload_folder = _upload_folder
+    with archive:
+        image_filenames = []
+        for info in entries:
+            with archive.open(info) as src:
+                image_filenames.append(_save_upload(src, info.filename, upload_folder))
+    return image_filenames
+
+def _text(value):
+    return value
+
+def _text_or_blank(value):
+    return '' if value is None else value
+
+def _int_or(default):
+    return lambda value: int(value or default)
+
+def _float_or(default):
+    return lambda value: float(value or default)
+
+def _optional_float(value):
+    return float(value) if value else None
+
+# Property form fields in storage order, each with the converter applied to its raw form value
+_PROPERTY_FORM_FIELDS = (
+    ('judul_properti', _text),
+    ('kelurahan', _text),
+    ('kecamatan', _text),
+    ('alamat', _text),
+    ('deskripsi', _text_or_blank),
+    ('luas_tanah', _int_or(0)),
+    ('luas_bangunan', _int_or(0)),
+    ('kamar_tidur', _int_or(2)),
+    ('kamar_mandi', _int_or(1)),
+    ('carport', _int_or(0)),
+    ('tahun_dibangun', _int_or(2020)),
+    ('lantai', _int_or(1)),
+    ('kota', _text),
+    ('harga', _parse_price),
+    ('latitude', _optional_float),
+    ('longitude', _optional_float),
+    ('jarak_sekolah', _float_or(1000)),
+    ('jarak_rs', _float_or(2000)),
+    ('jarak_pasar', _float_or(1500)),
+    ('jenis_jalan', _text),
+    ('kondisi', _text),
+    ('sertifikat', _text),
+    ('nama_penjual', _text_or_blank),
+    ('nomor_penjual', _text_or_blank),
+)
+
+def _parse_property_form(form):
+    """Convert a submitted add/edit property form into property fields"""
+    get = form.get
+    return {name: convert(get(name)) for name, convert in _PROPERTY_FORM_FIELDS}
+
 admin_bp = Blueprint('admin', __name__)
 
+# Upload folder, bound once when the blueprint is registered instead of read from config per request
+_upload_folder = None
+
+@admin_bp.record_once
+def _bind_upload_folder(state):
+    global _upload_folder
+    _upload_folder = state.app.config['UPLOAD_FOLDER']
+
 @admin_bp.route('/')
 def admin_panel():
     """Admin panel dashboard"""
@@ -35,57 +176,36 @@ def properties():
 @admin_bp.route('/add_property', methods=['POST'])
 def add_property():
     """Add new property"""
+    # One timestamp per request, shared by every record this request creates
+    now_iso = datetime.now().isoformat()
     try:
+        # Bulk upload: images packed into a single ZIP archive. Checked before any
+        # image is saved so a rejected archive leaves no unreferenced files behind
+        images_zip = request.files.get('images_zip')
+        zip_upload = _open_image_zip(images_zip) if images_zip and images_zip.filename else None
+        
         # Handle multiple file uploads
         image_filenames = []
         if 'images' in request.files:
-            files = request.files.getlist('images')
-            for file in files:
-                if file and file.filename:
-                    filename = secure_filename(file.filename)
-                    image_filename = f"{uuid.uuid4()}_{filename}"
-                    file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], image_filename))
-                    image_filenames.append(image_filename)
+            image_filenames = _save_uploads(request.files.getlist('images'))
+        
+        if zip_upload:
+            image_filenames.extend(_save_zip_uploads(*zip_upload))
         
         # Backward compatibility: check for single image upload
         if 'image' in request.files and not image_filenames:
-            file = request.files['image']
-            if file and file.filename:
-                filename = secure_filename(file.filename)
-                image_filename = f"{uuid.uuid4()}_{filename}"
-                file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], image_filename))
-                image_filenames.append(image_filename)
+            image_filenames = _save_uploads([request.files['image']])
+        
+        # Identical images share a content-hash name: list each once, keeping upload order
+        image_filenames = list(dict.fromkeys(image_filenames))
 
         # Create property data
         property_data = {
             'id': str(uuid.uuid4()),
-            'judul_properti': request.form.get('judul_properti'),
-            'kelurahan': request.form.get('kelurahan'),
-            'kecamatan': request.form.get('kecamatan'),
-            'alamat': request.form.get('alamat'),
-            'deskripsi': request.form.get('deskripsi', ''),
-            'luas_tanah': int(request.form.get('luas_tanah') or 0),
-            'luas_bangunan': int(request.form.get('luas_bangunan') or 0),
-            'kamar_tidur': int(request.form.get('kamar_tidur') or 2),
-            'kamar_mandi': int(request.form.get('kamar_mandi') or 1),
-            'carport': int(request.form.get('carport', 0) or 0),
-            'tahun_dibangun': int(request.form.get('tahun_dibangun') or 2020),
-            'lantai': int(request.form.get('lantai', 1) or 1),
-            'kota': request.form.get('kota'),
-            'harga': _parse_price(request.form.get('harga')),
-            'latitude': float(request.form.get('latitude') or 0) if request.form.get('latitude') else None,
-            'longitude': float(request.form.get('longitude') or 0) if request.form.get('longitude') else None,
-            'jarak_sekolah': float(request.form.get('jarak_sekolah', 1000) or 1000),
-            'jarak_rs': float(request.form.get('jarak_rs', 2000) or 2000),
-            'jarak_pasar': float(request.form.get('jarak_pasar', 1500) or 1500),
-            'jenis_jalan': request.form.get('jenis_jalan'),
-            'kondisi': request.form.get('kondisi'),
-            'sertifikat': request.form.get('sertifikat'),
-            'nama_penjual': request.form.get('nama_penjual', ''),
-            'nomor_penjual': request.form.get('nomor_penjual', ''),
+            **_parse_property_form(request.form),
             'images': image_filenames,
             'image': image_filenames[0] if image_filenames else None,  # Backward compatibility
-            'created_at': datetime.now().isoformat(),
+            'created_at': now_iso,
             'status': 'available'
         }
 
@@ -93,7 +213,7 @@ def add_property():
         PropertyRepository.add_property(property_data)
 
         # Retrain ML model with new data
-        ml_service.train_model()
+        ml_service.schedule_training()
 
         flash('Property added successfully!')
 
@@ -130,14 +250,7 @@ def update_property(property_id):
         image_filenames = existing_images.copy()  # Keep existing images by default
         
         if 'images' in request.files:
-            files = request.files.getlist('images')
-            new_images = []
-            for file in files:
-                if file and file.filename:
-                    filename = secure_filename(file.filename)
-                    image_filename = f"{uuid.uuid4()}_{filename}"
-                    file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], image_filename))
-                    new_images.append(image_filename)
+            new_images = _save_uploads(request.files.getlist('images'))
             
             # If new images uploaded, replace all images
             if new_images:
@@ -145,48 +258,27 @@ def update_property(property_id):
         
         # Backward compatibility: check for single image upload
         elif 'image' in request.files:
-            file = request.files['image']
-            if file and file.filename:
-                filename = secure_filename(file.filename)
-                image_filename = f"{uuid.uuid4()}_{filename}"
-                file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], image_filename))
-                image_filenames = [image_filename]
+            new_images = _save_uploads([request.files['image']])
+            if new_images:
+                image_filenames = new_images
+        
+        # Identical images share a content-hash name: list each once, keeping upload order
+        image_filenames = list(dict.fromkeys(image_filenames))
 
         # Create updated property data
         updated_data = {
-            'judul_properti': request.form.get('judul_properti'),
-            'kelurahan': request.form.get('kelurahan'),
-            'kecamatan': request.form.get('kecamatan'),
-            'alamat': request.form.get('alamat'),
-            'deskripsi': request.form.get('deskripsi', ''),
-            'luas_tanah': int(request.form.get('luas_tanah') or 0),
-            'luas_bangunan': int(request.form.get('luas_bangunan') or 0),
-            'kamar_tidur': int(request.form.get('kamar_tidur') or 2),
-            'kamar_mandi': int(request.form.get('kamar_mandi') or 1),
-            'carport': int(request.form.get('carport', 0) or 0),
-            'tahun_dibangun': int(request.form.get('tahun_dibangun') or 2020),
-            'lantai': int(request.form.get('lantai', 1) or 1),
-            'kota': request.form.get('kota'),
-            'harga': _parse_price(request.form.get('harga')),
-            'latitude': float(request.form.get('latitude') or 0) if request.form.get('latitude') else None,
-            'longitude': float(request.form.get('longitude') or 0) if request.form.get('longitude') else None,
-            'jarak_sekolah': float(request.form.get('jarak_sekolah', 1000) or 1000),
-            'jarak_rs': float(request.form.get('jarak_rs', 2000) or 2000),
-            'jarak_pasar': float(request.form.get('jarak_pasar', 1500) or 1500),
-            'jenis_jalan': request.form.get('jenis_jalan'),
-            'kondisi': request.form.get('kondisi'),
-            'sertifikat': request.form.get('sertifikat'),
-            'nama_penjual': request.form.get('nama_penjual', ''),
-            'nomor_penjual': request.form.get('nomor_penjual', ''),
+            **_parse_property_form(request.form),
             'images': image_filenames,
             'image': image_filenames[0] if image_filenames else None,  # Backward compatibility
             'status': request.form.get('status', 'available')
         }
 
         # Update property
+        old_signature = ml_service.training_signature(property_data)
         if PropertyRepository.update_property(property_id, updated_data):
-            # Retrain ML model with updated data
-            ml_service.train_model()
+            # Retrain ML model only if the edit changed training data
+            if ml_service.training_signature(updated_data) != old_signature:
+                ml_service.schedule_training()
             flash('Property updated successfully!')
         else:
             flash('Failed to update property')
@@ -199,9 +291,11 @@ def update_property(property_id):
 @admin_bp.route('/delete_property/<property_id>')
 def delete_property(property_id):
     """Delete property"""
+    property_data = PropertyRepository.get_property_by_id(property_id)
     if PropertyRepository.delete_property(property_id):
-        # Retrain model
-        ml_service.train_model()
+        # Retrain model unless the deleted property was never part of the training data
+        if property_data is None or ml_service.is_training_row(property_data):
+            ml_service.schedule_training()
         flash('Property deleted successfully!')
     else:
         flash('Property not found')
@@ -1,15 +1,41 @@
-from flask import Blueprint, jsonify, request
+import logging
+from flask import Blueprint, jsonify, request, current_app
 from app.models import PropertyRepository
 from app.services.ai_service import AIPropertySearch
 from app.services.ml_service import ml_service
+from app.utils.format_utils import format_rupiah
+
+log = logging.getLogger(__name__)
 
 api_bp = Blueprint('api', __name__)
 
+# (properties, body) for the last list served in full by /api/properties
+_properties_body_cache = {'entry': None}
+
+def _properties_body(properties):
+    """Serialized JSON body for the property list, rebuilt only when the cached list changes"""
+    entry = _properties_body_cache['entry']
+    if entry is None or entry[0] is not properties:
+        entry = (properties, current_app.json.response(properties).get_data())
+        _properties_body_cache['entry'] = entry
+    return entry[1]
+
 @api_bp.route('/properties')
 def get_properties():
-    """API endpoint for properties"""
-    properties = PropertyRepository.load_properties()
-    return jsonify(properties)
+    """API endpoint for properties, revalidated with an ETag so unchanged lists return 304"""
+    # Read the version before loading so a concurrent write can only make the ETag older, never newer
+    etag = PropertyRepository.version()
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.response_class(
+            _properties_body(PropertyRepository.load_properties()),
+            mimetype=current_app.json.mimetype
+        )
+    response.set_etag(etag, weak=True)
+    response.cache_control.public = True
+    response.cache_control.max_age = 0
+    return response
 
 @api_bp.route('/search_properties', methods=['POST'])
 def search_properties():
@@ -18,7 +44,8 @@ def search_properties():
         data = request.get_json()
         query = data.get('query', '').strip()
         
-        print(f"Search query received: {query}")  # Debug log
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Search query received: %s", query)
         
         if not query:
             response_data = {
@@ -39,7 +66,7 @@ def search_properties():
         return response
         
     except Exception as e:
-        print(f"Search error: {str(e)}")  # Debug log
+        log.error("Search error: %s", e)
         # Fallback to basic properties on error
         error_response = {
             'properties': PropertyRepository.load_properties()[:5],
@@ -57,10 +84,9 @@ def predict_price():
     try:
         data = request.get_json()
         
-        # Log input data for debugging
-        print(f"Prediction input received: {data}")
-        print(f"Input keys: {list(data.keys()) if data else 'No data'}")
-        print(f"Input values: {list(data.values()) if data else 'No values'}")
+        # Log input data for debugging (skipped entirely unless DEBUG is enabled)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Prediction input received: %s", data)
         
         # Get price prediction
         predicted_price = ml_service.predict_price(data)
@@ -72,25 +98,11 @@ def predict_price():
                 'min_price': max(0, predicted_price - variation),
                 'max_price': predicted_price + variation,
                 'predicted_price': predicted_price,
-                'formatted': f"Rp {predicted_price:,.0f}".replace(',', '.')
+                'formatted': format_rupiah(predicted_price)
             }
             
-            # Find similar properties within 30% of predicted price
-            all_properties = PropertyRepository.load_properties()
-            similar_properties = []
-            price_tolerance = predicted_price * 0.3  # 30% tolerance
-            min_similar_price = predicted_price - price_tolerance
-            max_similar_price = predicted_price + price_tolerance
-            
-            for prop in all_properties:
-                if prop.get('harga') and prop.get('status') == 'available':
-                    prop_price = float(prop['harga'])
-                    if min_similar_price <= prop_price <= max_similar_price:
-                        similar_properties.append(prop)
-            
-            # Sort by price difference and limit to 6 properties
-            similar_properties.sort(key=lambda p: abs(float(p['harga']) - predicted_price))
-            similar_properties = similar_properties[:6]
+            # Find up to 6 available properties within 30% of predicted price, closest first
+            similar_properties = PropertyRepository.find_similar_by_price(predicted_price, tolerance=0.3, limit=6)
             
             response_data = {
                 'success': True,
@@ -100,7 +112,8 @@ def predict_price():
                 'timestamp': request.args.get('t', '')  # Include timestamp for debugging
             }
             
-            print(f"Prediction result: {predicted_price:,.0f}")  # Debug log
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Prediction result: %s", f"{predicted_price:,.0f}")
             
             # Create response with no-cache headers
             response = jsonify(response_data)
@@ -113,24 +126,5 @@ def predict_price():
             return jsonify({'success': False, 'error': 'Unable to predict price'})
     
     except Exception as e:
-        print(f"Prediction error: {str(e)}")  # Debug log
+        log.error("Prediction error: %s", e)
         return jsonify({'success': False, 'error': str(e)})
-def predict_price():
-    """API endpoint for price prediction"""
-    try:
-        data = request.get_json()
-        prediction = ml_service.predict_price(data)
-        
-        if prediction:
-            return jsonify({
-                'prediction': prediction, 
-                'formatted': f"Rp {prediction:,.0f}"
-            })
-        else:
-            return jsonify({
-                'error': 'Cannot predict price with current data. Please check if all required fields are provided.'
-            }), 400
-    except Exception as e:
-        return jsonify({
-            'error': f'Prediction failed: {str(e)}'
-        }), 500
\ No newline at end of file
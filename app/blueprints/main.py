@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from app.models import PropertyRepository
 from app.services.ai_service import gemini_chat_response
 from app.services.ml_service import ml_service
+from app.utils.format_utils import format_rupiah
 
 main_bp = Blueprint('main', __name__)
 
@@ -23,12 +24,11 @@ def properties():
     kecamatan = request.args.get('kecamatan', type=str)
     
     filtered_properties = properties
-    if budget_min:
-        filtered_properties = [p for p in filtered_properties if p.get('harga', 0) >= budget_min]
-    if budget_max:
-        filtered_properties = [p for p in filtered_properties if p.get('harga', 0) <= budget_max]
-    if kecamatan:
-        filtered_properties = [p for p in filtered_properties if p.get('kecamatan', '').strip().lower() == kecamatan.strip().lower()]
+    if budget_min or budget_max or kecamatan:
+        # Indexed lookup: kecamatan bucket, then a price range bisect
+        filtered_properties = PropertyRepository.filter_listing(
+            budget_min or 0, budget_max or float('inf'), kecamatan
+        )
     
     return render_template('properties.html', properties=filtered_properties)
 
@@ -41,9 +41,9 @@ def property_detail(property_id):
         flash('Property not found')
         return redirect(url_for('main.properties'))
     
-    # Get similar properties
+    # Get similar properties: the first three others, so at most four entries need checking
     all_properties = PropertyRepository.load_properties()
-    similar_properties = [p for p in all_properties if p['id'] != property_id][:3]
+    similar_properties = [p for p in all_properties[:4] if p['id'] != property_id][:3]
     
     return render_template('property_detail.html', property=property_data, similar_properties=similar_properties)
 
@@ -81,26 +81,13 @@ def predict():
                 'min_price': max(0, predicted_price - variation),
                 'max_price': predicted_price + variation,
                 'predicted_price': predicted_price,
-                'formatted_predicted': f"Rp {predicted_price:,.0f}".replace(',', '.'),
-                'formatted_min': f"Rp {max(0, predicted_price - variation):,.0f}".replace(',', '.'),
-                'formatted_max': f"Rp {predicted_price + variation:,.0f}".replace(',', '.')
+                'formatted_predicted': format_rupiah(predicted_price),
+                'formatted_min': format_rupiah(max(0, predicted_price - variation)),
+                'formatted_max': format_rupiah(predicted_price + variation)
             }
             
-            # Find similar properties within 30% of predicted price
-            all_properties = PropertyRepository.load_properties()
-            price_tolerance = predicted_price * 0.3  # 30% tolerance
-            min_similar_price = predicted_price - price_tolerance
-            max_similar_price = predicted_price + price_tolerance
-            
-            for prop in all_properties:
-                if prop.get('harga') and prop.get('status') == 'available':
-                    prop_price = float(prop['harga'])
-                    if min_similar_price <= prop_price <= max_similar_price:
-                        similar_properties.append(prop)
-            
-            # Sort by price difference and limit to 6 properties
-            similar_properties.sort(key=lambda p: abs(float(p['harga']) - predicted_price))
-            similar_properties = similar_properties[:6]
+            # Find similar properties within 30% of predicted price, closest first
+            similar_properties = PropertyRepository.find_similar_by_price(predicted_price, tolerance=0.3, limit=6)
     
     return render_template('predict.html', price_range=price_range, similar_properties=similar_properties)
 
@@ -1,4 +1,5 @@
 import os
+from types import MappingProxyType
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -12,6 +13,11 @@ class Config:
 
     UPLOAD_FOLDER = 'static/images'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    UPLOAD_CACHE_MAX_AGE = 365 * 24 * 60 * 60  # Uploaded image names are unique, cache for a year
+    # Let a front-end server that honours X-Sendfile (Apache mod_xsendfile, lighttpd) stream static files
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+    # Werkzeug debugger/reloader for `python main.py`; production runs under gunicorn
+    DEBUG = os.getenv('FLASK_DEBUG', '').lower() in ('1', 'true', 'yes')
 
     # ML Model configuration
     FEATURE_COLUMNS = [
@@ -19,17 +25,27 @@ class Config:
         'carport', 'tahun_dibangun', 'lantai', 'jarak_sekolah', 'jarak_rs', 
         'jarak_pasar', 'jenis_jalan_encoded', 'kondisi_encoded', 'sertifikat_encoded'
     ]
+    # Raw property fields the training data is built from (see MLPredictionService.prepare_ml_data)
+    TRAINING_FIELDS = (
+        'harga', 'luas_tanah', 'luas_bangunan', 'kamar_tidur', 'kamar_mandi',
+        'carport', 'tahun_dibangun', 'lantai', 'jarak_sekolah', 'jarak_rs',
+        'jarak_pasar', 'jenis_jalan', 'kondisi', 'sertifikat'
+    )
+    ML_RETRAIN_DELAY = 30  # Seconds of quiet after the last property edit before retraining
 
     # Gemini AI configuration
     GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+    GEMINI_MODEL = 'gemini-2.0-flash-exp'
+    GEMINI_TIMEOUT_MS = 15000  # Per-request HTTP timeout for the Gemini client
+    GEMINI_RETRY_BUDGET = 10  # Seconds a request may spend retrying an overloaded Gemini API
 
     # Google Maps configuration
     GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY')
 
-    # Encoding mappings for categorical variables
-    JENIS_JALAN_MAP = {'gang_kecil': 1, 'jalan_sedang': 2, 'jalan_besar': 3}
-    KONDISI_MAP = {'butuh_renovasi': 1, 'renovasi_ringan': 2, 'baik': 3, 'baru': 4}
-    SERTIFIKAT_MAP = {'girik': 1, 'hgb': 2, 'shm': 3}
+    # Encoding mappings for categorical variables (read-only: the model's features depend on them)
+    JENIS_JALAN_MAP = MappingProxyType({'gang_kecil': 1, 'jalan_sedang': 2, 'jalan_besar': 3})
+    KONDISI_MAP = MappingProxyType({'butuh_renovasi': 1, 'renovasi_ringan': 2, 'baik': 3, 'baru': 4})
+    SERTIFIKAT_MAP = MappingProxyType({'girik': 1, 'hgb': 2, 'shm': 3})
 
     # Prabumulih-specific area mappings
     AREA_MAP = {
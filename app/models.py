@@ -1,118 +1,323 @@
-import json
+import heapq
 import os
-from typing import List, Dict, Optional
+import sys
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, List, Dict, Mapping, Optional, Tuple
+from flask import g, has_request_context
 from app.config import Config
+from app.utils.json_utils import read_json_file, write_json_file
+
+def _file_stamp(path: str) -> Optional[Tuple[int, int]]:
+    """Return (mtime_ns, size) for a file, or None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+# Categorical fields whose handful of distinct values repeat across every record
+_SHARED_VALUE_FIELDS = ('kelurahan', 'kecamatan', 'kota', 'jenis_jalan', 'kondisi', 'sertifikat', 'status')
+
+def _intern_shared_values(properties: List[Dict]) -> None:
+    """Make records share one string object per distinct categorical value"""
+    for p in properties:
+        for field in _SHARED_VALUE_FIELDS:
+            value = p.get(field)
+            if type(value) is str:
+                p[field] = sys.intern(value)
 
 class PropertyRepository:
     """Handle property data operations"""
     
+    # Parsed properties.json, reused until the file's stamp changes.
+    # The cached list is shared: callers must copy it before mutating.
+    _cache: Dict = {'stamp': None, 'data': None}
+    # Serializes cache refreshes so concurrent requests parse a changed file only once.
+    # Writers hold it across load, change and save so concurrent edits can't overwrite each other
+    # (reentrant: load and save take it again inside).
+    _lock = threading.RLock()
+    
     @staticmethod
     def load_properties() -> List[Dict]:
-        """Load properties from JSON file"""
-        try:
-            with open('data/properties.json', 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            return []
+        """Load properties from JSON file (cached until the file changes, checked once per request)"""
+        if not has_request_context():
+            return PropertyRepository._load_cached()
+        properties = g.get('_properties')
+        if properties is None:
+            properties = g._properties = PropertyRepository._load_cached()
+        return properties
+    
+    @staticmethod
+    def _load_cached() -> List[Dict]:
+        cache = PropertyRepository._cache
+        with PropertyRepository._lock:
+            stamp = _file_stamp('data/properties.json')
+            if stamp is None:
+                return []
+            if stamp == cache['stamp']:
+                return cache['data']
+            try:
+                data = read_json_file('data/properties.json')
+            except FileNotFoundError:
+                return []
+            _intern_shared_values(data)
+            cache['stamp'] = stamp
+            cache['data'] = data
+            return data
+    
+    @staticmethod
+    def version() -> str:
+        """Opaque token that changes whenever properties.json is rewritten"""
+        stamp = _file_stamp('data/properties.json')
+        return f"{stamp[0]:x}-{stamp[1]:x}" if stamp else 'empty'
     
     @staticmethod
     def save_properties(properties: List[Dict]) -> None:
         """Save properties to JSON file"""
-        with open('data/properties.json', 'w') as f:
-            json.dump(properties, f, indent=2)
+        cache = PropertyRepository._cache
+        with PropertyRepository._lock:
+            write_json_file('data/properties.json', properties)
+            # Keep the freshly written list so the next load skips re-parsing
+            cache['stamp'] = _file_stamp('data/properties.json')
+            cache['data'] = properties
+        if has_request_context():
+            g._properties = properties
+    
+    @staticmethod
+    def _derived(name: str, build: Callable[[List[Dict]], Any]) -> Tuple[List[Dict], Any]:
+        """Return (properties, index) for an index built from the cached property list.
+        
+        The index is rebuilt only when the cached list itself changes.
+        """
+        properties = PropertyRepository.load_properties()
+        cache = PropertyRepository._cache
+        entry = cache.get(name)
+        if entry is None or entry[0] is not properties:
+            entry = (properties, build(properties))
+            cache[name] = entry
+        return entry
+    
+    @staticmethod
+    def _build_price_index(properties: List[Dict]) -> Tuple[List[float], List[int]]:
+        entries = sorted(
+            (float(p['harga']), i) for i, p in enumerate(properties)
+            if p.get('harga') and p.get('status') == 'available'
+        )
+        return [price for price, _ in entries], [i for _, i in entries]
+    
+    @staticmethod
+    def price_index() -> Tuple[List[Dict], List[float], List[int]]:
+        """Return (properties, prices, positions) for available, priced properties sorted by price.
+        
+        positions[j] is the index in properties of the j-th cheapest entry.
+        """
+        properties, (prices, positions) = PropertyRepository._derived(
+            'price_index', PropertyRepository._build_price_index
+        )
+        return properties, prices, positions
+    
+    @staticmethod
+    def find_similar_by_price(price: float, tolerance: float = 0.3, limit: int = 6) -> List[Dict]:
+        """Available properties priced within ±tolerance of price, closest first"""
+        properties, prices, positions = PropertyRepository.price_index()
+        margin = price * tolerance
+        lo = bisect_left(prices, price - margin)
+        hi = bisect_right(prices, price + margin)
+        # Order by price difference, ties keep catalog order
+        closest = heapq.nsmallest(limit, range(lo, hi), key=lambda j: (abs(prices[j] - price), positions[j]))
+        return [properties[positions[j]] for j in closest]
+    
+    @staticmethod
+    def _build_price_stats(properties: List[Dict]) -> Dict[str, float]:
+        lowest = highest = None
+        total = 0
+        count = 0
+        # Every priced listing regardless of status, as summarized for the chatbot
+        catalog_total = 0.0
+        catalog_priced = 0
+        for p in properties:
+            price = p.get('harga')
+            if price:
+                catalog_total += float(price)
+                catalog_priced += 1
+            if p.get('status') != 'available' or price is None or price <= 0:
+                continue
+            if lowest is None or price < lowest:
+                lowest = price
+            if highest is None or price > highest:
+                highest = price
+            total += price
+            count += 1
+        return {
+            'min': lowest if count else 0,
+            'max': highest if count else 0,
+            'avg': total / count if count else 0,
+            'available_count': count,
+            'catalog_count': len(properties),
+            'catalog_avg': catalog_total / catalog_priced if catalog_priced else None
+        }
+    
+    @staticmethod
+    def price_stats() -> Dict[str, float]:
+        """Min/max/avg of positive prices among available properties, plus the listing count and
+        average price of the whole catalog, computed once per file version"""
+        _, stats = PropertyRepository._derived('price_stats', PropertyRepository._build_price_stats)
+        return stats
+    
+    @staticmethod
+    def available_properties() -> List[Dict]:
+        """Properties with status 'available', cached alongside the full list"""
+        _, available = PropertyRepository._derived(
+            'available', lambda properties: [p for p in properties if p.get('status') == 'available']
+        )
+        return available
+    
+    @staticmethod
+    def _build_listing_index(properties: List[Dict]) -> Dict[Optional[str], Tuple[List[float], List[int]]]:
+        # One price-sorted bucket per normalized kecamatan, plus None for the whole catalog.
+        # Missing prices sort as 0, matching the listing filter.
+        entries = {None: []}
+        for i, p in enumerate(properties):
+            kecamatan = (p.get('kecamatan') or '').strip().lower()
+            entry = ((p.get('harga') or 0), i)
+            entries[None].append(entry)
+            entries.setdefault(kecamatan, []).append(entry)
+        index = {}
+        for key, bucket in entries.items():
+            bucket.sort()
+            index[key] = ([price for price, _ in bucket], [i for _, i in bucket])
+        return index
+    
+    @staticmethod
+    def filter_listing(price_min: float = 0, price_max: float = float('inf'),
+                       kecamatan: Optional[str] = None) -> List[Dict]:
+        """Properties priced within [price_min, price_max] and, if given, in kecamatan
+        (case/whitespace-insensitive), in catalog order"""
+        properties, index = PropertyRepository._derived(
+            'listing_index', PropertyRepository._build_listing_index
+        )
+        key = (kecamatan or '').strip().lower() or None
+        bucket = index.get(key)
+        if bucket is None:
+            return []
+        prices, positions = bucket
+        lo = bisect_left(prices, price_min)
+        hi = bisect_right(prices, price_max)
+        return [properties[i] for i in sorted(positions[lo:hi])]
     
     @staticmethod
     def get_property_by_id(property_id: str) -> Optional[Dict]:
         """Get property by ID"""
-        properties = PropertyRepository.load_properties()
-        return next((p for p in properties if p['id'] == property_id), None)
+        _, by_id = PropertyRepository._derived(
+            'by_id', lambda properties: {p['id']: p for p in reversed(properties)}
+        )
+        return by_id.get(property_id)
     
     @staticmethod
     def add_property(property_data: Dict) -> None:
         """Add new property"""
-        properties = PropertyRepository.load_properties()
-        properties.append(property_data)
-        PropertyRepository.save_properties(properties)
+        with PropertyRepository._lock:
+            properties = list(PropertyRepository._load_cached())
+            properties.append(property_data)
+            PropertyRepository.save_properties(properties)
     
     @staticmethod
     def update_property(property_id: str, updated_data: Dict) -> bool:
         """Update existing property"""
-        properties = PropertyRepository.load_properties()
-        for i, property_data in enumerate(properties):
-            if property_data['id'] == property_id:
-                # Keep the original ID and created_at
-                updated_data['id'] = property_id
-                if 'created_at' not in updated_data and 'created_at' in property_data:
-                    updated_data['created_at'] = property_data['created_at']
-                properties[i] = updated_data
-                PropertyRepository.save_properties(properties)
-                return True
-        return False
+        with PropertyRepository._lock:
+            properties = list(PropertyRepository._load_cached())
+            for i, property_data in enumerate(properties):
+                if property_data['id'] == property_id:
+                    # Keep the original ID and created_at
+                    updated_data['id'] = property_id
+                    if 'created_at' not in updated_data and 'created_at' in property_data:
+                        updated_data['created_at'] = property_data['created_at']
+                    properties[i] = updated_data
+                    PropertyRepository.save_properties(properties)
+                    return True
+            return False
 
     @staticmethod
     def delete_property(property_id: str) -> bool:
         """Delete property by ID"""
-        properties = PropertyRepository.load_properties()
-        original_count = len(properties)
-        properties = [p for p in properties if p['id'] != property_id]
-        
-        if len(properties) < original_count:
-            PropertyRepository.save_properties(properties)
-            return True
-        return False
+        with PropertyRepository._lock:
+            properties = PropertyRepository._load_cached()
+            original_count = len(properties)
+            properties = [p for p in properties if p['id'] != property_id]
+            
+            if len(properties) < original_count:
+                PropertyRepository.save_properties(properties)
+                return True
+            return False
 
-def encode_categorical(value: str, mapping: Dict[str, int]) -> int:
+def encode_categorical(value: str, mapping: Mapping[str, int]) -> int:
     """Encode categorical values using provided mapping"""
     return mapping.get(value, 0)
 
+# Base prices written on first start when data/base_prices.json does not exist yet
+DEFAULT_BASE_PRICES = {
+    'base_price_per_sqm_land': 500000,  # Rp per m2 tanah
+    'base_price_per_sqm_building': 2000000,  # Rp per m2 bangunan
+    'room_multiplier': 50000000,  # Bonus per kamar
+    'bathroom_multiplier': 25000000,  # Bonus per kamar mandi
+    'floor_multiplier': 10000000,  # Bonus per lantai
+    'carport_multiplier': 15000000,  # Bonus per carport
+    'year_bonus_per_year': 2000000,  # Bonus per tahun setelah 2000
+    'condition_multipliers': {
+        'baru': 1.3,
+        'baik': 1.0,
+        'renovasi_ringan': 0.8,
+        'butuh_renovasi': 0.6
+    },
+    'road_multipliers': {
+        'jalan_besar': 1.2,
+        'jalan_sedang': 1.0,
+        'gang_kecil': 0.8
+    },
+    'certificate_multipliers': {
+        'shm': 1.1,
+        'hgb': 1.0,
+        'girik': 0.9
+    }
+}
+
 class BasePriceRepository:
     """Handle base price settings for predictions"""
     
+    # Parsed base_prices.json, reused until the file's stamp changes (shared, copy before mutating)
+    _cache: Dict = {'stamp': None, 'data': None}
+    
+    @staticmethod
+    def bootstrap_base_prices() -> Dict:
+        """Write the default base prices if none are saved yet, then load them (run once at startup)"""
+        if _file_stamp('data/base_prices.json') is None:
+            BasePriceRepository.save_base_prices(dict(DEFAULT_BASE_PRICES))
+        return BasePriceRepository.load_base_prices()
+    
     @staticmethod
     def load_base_prices() -> Dict:
-        """Load base price settings from JSON file"""
-        try:
-            with open('data/base_prices.json', 'r') as f:
-                return json.load(f)
-        except FileNotFoundError:
-            # Default base prices
-            default_prices = {
-                'base_price_per_sqm_land': 500000,  # Rp per m2 tanah
-                'base_price_per_sqm_building': 2000000,  # Rp per m2 bangunan
-                'room_multiplier': 50000000,  # Bonus per kamar
-                'bathroom_multiplier': 25000000,  # Bonus per kamar mandi
-                'floor_multiplier': 10000000,  # Bonus per lantai
-                'carport_multiplier': 15000000,  # Bonus per carport
-                'year_bonus_per_year': 2000000,  # Bonus per tahun setelah 2000
-                'condition_multipliers': {
-                    'baru': 1.3,
-                    'baik': 1.0,
-                    'renovasi_ringan': 0.8,
-                    'butuh_renovasi': 0.6
-                },
-                'road_multipliers': {
-                    'jalan_besar': 1.2,
-                    'jalan_sedang': 1.0,
-                    'gang_kecil': 0.8
-                },
-                'certificate_multipliers': {
-                    'shm': 1.1,
-                    'hgb': 1.0,
-                    'girik': 0.9
-                }
-            }
-            BasePriceRepository.save_base_prices(default_prices)
-            return default_prices
+        """Load base price settings from JSON file (cached until the file changes)"""
+        cache = BasePriceRepository._cache
+        stamp = _file_stamp('data/base_prices.json')
+        if stamp is None:
+            # Nothing saved (bootstrap not run or file removed): never write from the read path
+            return cache['data'] if cache['data'] is not None else DEFAULT_BASE_PRICES
+        if stamp == cache['stamp']:
+            return cache['data']
+        data = read_json_file('data/base_prices.json')
+        cache['stamp'] = stamp
+        cache['data'] = data
+        return data
     
     @staticmethod
     def save_base_prices(base_prices: Dict) -> bool:
         """Save base price settings to JSON file"""
         try:
-            # Ensure the data directory exists
-            os.makedirs('data', exist_ok=True)
-            
-            with open('data/base_prices.json', 'w') as f:
-                json.dump(base_prices, f, indent=2)
+            write_json_file('data/base_prices.json', base_prices)
+            cache = BasePriceRepository._cache
+            cache['stamp'] = _file_stamp('data/base_prices.json')
+            cache['data'] = base_prices
             return True
         except Exception as e:
             print(f"Error saving base prices: {e}")
@@ -122,10 +327,9 @@ class BasePriceRepository:
     def update_base_prices(updated_data: Dict) -> bool:
         """Update base price settings"""
         try:
-            current_prices = BasePriceRepository.load_base_prices()
+            current_prices = dict(BasePriceRepository.load_base_prices())
             current_prices.update(updated_data)
-            BasePriceRepository.save_base_prices(current_prices)
-            return True
+            return BasePriceRepository.save_base_prices(current_prices)
         except Exception as e:
             print(f"Error updating base prices: {e}")
             return False
\ No newline at end of file
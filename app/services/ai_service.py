@@ -2,18 +2,118 @@ import json
 import os
 import time
 import random
-from typing import List, Dict, Optional
+import threading
+from collections import Counter
+from typing import List, Dict, Optional, Tuple
+import numpy as np
 from dotenv import load_dotenv
+from app.config import Config
 from app.models import PropertyRepository
+from app.utils.format_utils import format_rupiah
+from app.utils.json_utils import loads_json
 
 load_dotenv()
 
+_CRITERIA_FIELDS = [
+    "judul_properti", "kelurahan", "kecamatan", "alamat", "deskripsi",
+    "luas_tanah", "luas_bangunan", "kamar_tidur", "kamar_mandi", "carport",
+    "tahun_dibangun", "lantai", "harga", "jarak_sekolah", "jarak_rs", "jarak_pasar",
+    "jenis_jalan", "kondisi", "sertifikat"
+]
+_SAMPLE_KELURAHAN = [
+    "Sukaraja", "Majasari", "Gunung Ibul", "Patih Galung", "Wonosari",
+    "Gunung Kemala", "Sukajadi", "Karang Bindu", "Tanjung Telang",
+    "Tanjung Raman", "Cambai", "Muara Dua", "Anak Petai", "Pangkul",
+    "Karang Jaya", "Gunung Ibul Barat", "Mangga"
+]
+_SAMPLE_KECAMATAN = [
+    "Prabumulih Selatan", "Prabumulih Timur", "Prabumulih Barat",
+    "Prabumulih Utara", "Cambai", "Rambang Kapak Tengah"
+]
+
+# Static parts of the criteria prompt; only the price range and the query vary per call
+_CRITERIA_PROMPT_PREFIX = f"""Anda adalah asisten AI untuk sistem pencarian properti rumah. Tugas Anda adalah menganalisis pertanyaan pengguna dan mengekstrak kriteria pencarian.
+
+Database Properties memiliki field berikut:
+{json.dumps(_CRITERIA_FIELDS, indent=2)}
+
+Lokasi yang tersedia:
+Kelurahan: {', '.join(_SAMPLE_KELURAHAN)}
+Kecamatan: {', '.join(_SAMPLE_KECAMATAN)}
+
+"""
+
+_CRITERIA_PROMPT_SUFFIX = """Ekstrak kriteria pencarian dari pertanyaan di atas dan berikan dalam format JSON berikut:
+{
+  "budget_min": <angka atau null>,
+  "budget_max": <angka atau null>,
+  "kamar_tidur": <angka atau null>,
+  "kamar_mandi": <angka atau null>,
+  "kelurahan": <string atau null>,
+  "kecamatan": <string atau null>,
+  "luas_tanah_min": <angka atau null>,
+  "luas_bangunan_min": <angka atau null>,
+  "kondisi": <"baik" atau "sedang" atau "kurang" atau null>,
+  "sertifikat": <"SHM" atau "HGB" atau null>,
+  "carport": <angka atau null>,
+  "jarak_sekolah_max": <angka dalam meter atau null>,
+  "jarak_rs_max": <angka dalam meter atau null>,
+  "jarak_pasar_max": <angka dalam meter atau null>,
+  "price_preference": <"low" untuk murah, "high" untuk mahal, atau null>,
+  "search_keywords": [<array kata kunci dari deskripsi/alamat yang dicari>]
+}
+
+Panduan:
+- Jika pengguna menyebut "200 jutaan" atau "200 juta", set budget_min=140000000, budget_max=260000000 (±30%)
+- Jika pengguna menyebut "milyar" atau "M", kalikan dengan 1000000000
+- Jika pengguna menyebut lokasi spesifik, cari di kelurahan/kecamatan
+- Jika pengguna menyebut "dekat sekolah/rumah sakit/pasar", set jarak maksimal (contoh: 1000 meter)
+- Jika pengguna minta "murah" atau "termurah", set price_preference="low"
+- Jika pengguna minta "mewah" atau "mahal", set price_preference="high"
+- Ekstrak kata kunci penting untuk mencari di deskripsi/alamat (contoh: "citymall", "dekat", dll)
+
+Hanya berikan JSON, tanpa penjelasan tambahan."""
+
+_NULLABLE_NUMBER = {"type": "NUMBER", "nullable": True}
+_NULLABLE_INTEGER = {"type": "INTEGER", "nullable": True}
+
+# Response schema for Gemini's JSON output mode, mirroring the format described in the prompt
+CRITERIA_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "budget_min": _NULLABLE_NUMBER,
+        "budget_max": _NULLABLE_NUMBER,
+        "kamar_tidur": _NULLABLE_INTEGER,
+        "kamar_mandi": _NULLABLE_INTEGER,
+        "kelurahan": {"type": "STRING", "nullable": True},
+        "kecamatan": {"type": "STRING", "nullable": True},
+        "luas_tanah_min": _NULLABLE_NUMBER,
+        "luas_bangunan_min": _NULLABLE_NUMBER,
+        "kondisi": {"type": "STRING", "enum": ["baik", "sedang", "kurang"], "nullable": True},
+        "sertifikat": {"type": "STRING", "enum": ["SHM", "HGB"], "nullable": True},
+        "carport": _NULLABLE_INTEGER,
+        "jarak_sekolah_max": _NULLABLE_NUMBER,
+        "jarak_rs_max": _NULLABLE_NUMBER,
+        "jarak_pasar_max": _NULLABLE_NUMBER,
+        "price_preference": {"type": "STRING", "enum": ["low", "high"], "nullable": True},
+        "search_keywords": {"type": "ARRAY", "items": {"type": "STRING"}}
+    }
+}
+
 try:
     from google import genai
     from google.genai import types
     api_key = os.getenv("GEMINI_API_KEY")
     if api_key and api_key != "your_gemini_api_key_here":
-        client = genai.Client(api_key=api_key)
+        # One client (and its pooled HTTP connections) is shared by every request
+        client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(timeout=Config.GEMINI_TIMEOUT_MS)
+        )
+        criteria_config = types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=CRITERIA_SCHEMA
+        )
         GEMINI_AVAILABLE = True
     else:
         raise ValueError("GEMINI_API_KEY not found or not configured")
@@ -22,6 +122,81 @@ except Exception as e:
     GEMINI_AVAILABLE = False
     client = None
     types = None
+    criteria_config = None
+
+_warm_up_started = False
+
+def warm_up_client():
+    """Open the Gemini connection in the background so the first search skips the TLS handshake"""
+    global _warm_up_started
+    if not GEMINI_AVAILABLE or not client or _warm_up_started:
+        return
+    _warm_up_started = True
+
+    def _warm_up():
+        try:
+            # Model metadata lookup: reaches the API without spending generation tokens
+            client.models.get(model=Config.GEMINI_MODEL)
+        except Exception as e:
+            print(f"Gemini warm-up failed: {str(e)}")
+
+    threading.Thread(target=_warm_up, name='gemini-warm-up', daemon=True).start()
+
+def _as_float(value, default: float) -> float:
+    """Numeric property field as float; missing uses default, unusable values become NaN"""
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+def _build_search_columns(properties: List[Dict]) -> Dict[str, np.ndarray]:
+    """Lay out the fields used for scoring as one array per field (struct of arrays)"""
+    count = len(properties)
+    columns = {
+        'harga': np.fromiter((_as_float(p.get('harga'), np.nan) for p in properties), dtype=np.float64, count=count)
+    }
+    for field, default in (('kamar_tidur', 0), ('kamar_mandi', 0), ('luas_tanah', 0), ('luas_bangunan', 0),
+                           ('carport', 0), ('jarak_sekolah', 999999), ('jarak_rs', 999999), ('jarak_pasar', 999999)):
+        columns[field] = np.fromiter((_as_float(p.get(field, default), np.nan) for p in properties),
+                                     dtype=np.float64, count=count)
+    string_dtype = np.dtypes.StringDType()
+    columns['kelurahan'] = np.array([(p.get('kelurahan') or '').lower().strip() for p in properties], dtype=string_dtype)
+    columns['kecamatan'] = np.array([(p.get('kecamatan') or '').lower().strip() for p in properties], dtype=string_dtype)
+    columns['kondisi'] = np.array([(p.get('kondisi') or '').lower() for p in properties], dtype=string_dtype)
+    columns['sertifikat'] = np.array([(p.get('sertifikat') or '').upper() for p in properties], dtype=string_dtype)
+    columns['search_text'] = np.array(
+        [f"{p.get('judul_properti', '')} {p.get('deskripsi', '')} {p.get('alamat', '')}".lower() for p in properties],
+        dtype=string_dtype
+    )
+    return columns
+
+# (properties, columns) for the last list scored; the cached available list is reused across searches
+_search_columns_cache: Dict = {'entry': None}
+
+def _search_columns(properties: List[Dict]) -> Dict[str, np.ndarray]:
+    """Scoring columns for properties, rebuilt only when a different list is passed"""
+    entry = _search_columns_cache['entry']
+    if entry is None or entry[0] is not properties:
+        entry = (properties, _build_search_columns(properties))
+        _search_columns_cache['entry'] = entry
+    return entry[1]
+
+# Gemini criteria replies keyed by (whitespace/case-normalized query, price range); oldest dropped first
+_criteria_reply_cache: Dict[Tuple[str, Tuple[float, float, float]], str] = {}
+_criteria_reply_lock = threading.Lock()
+_CRITERIA_REPLY_CACHE_SIZE = 1024
+
+# Explanation fragments in display order, between the budget and the keywords.
+# Each entry lists alternatives; the first field with a truthy value is used.
+_EXPLANATION_TEMPLATES = (
+    (('kamar_tidur', "{} kamar tidur".format),),
+    (('kamar_mandi', "{} kamar mandi".format),),
+    (('kelurahan', "di kelurahan {}".format), ('kecamatan', "di kecamatan {}".format)),
+    (('kondisi', "kondisi {}".format),),
+    (('jarak_sekolah_max', "dekat sekolah (< {}m)".format),),
+)
 
 class AIPropertySearch:
     """AI-powered property search using Gemini for natural language understanding"""
@@ -47,8 +222,7 @@ class AIPropertySearch:
                 'ai_powered': False
             }
 
-        all_properties = PropertyRepository.load_properties()
-        available_properties = [p for p in all_properties if p.get('status') == 'available']
+        available_properties = PropertyRepository.available_properties()
 
         if not available_properties:
             return {
@@ -58,20 +232,18 @@ class AIPropertySearch:
             }
 
         try:
-            criteria = AIPropertySearch._extract_criteria_with_ai(query, available_properties)
+            criteria = AIPropertySearch._extract_criteria_with_ai(query)
             print(f"AI Extracted criteria: {criteria}")
 
-            filtered_properties = AIPropertySearch._filter_properties_with_criteria(
-                available_properties, criteria
-            )
-            print(f"Filtered results: {len(filtered_properties)} properties")
+            ranked = AIPropertySearch._rank_properties(available_properties, criteria)
+            print(f"Filtered results: {len(ranked)} properties")
 
-            if filtered_properties:
-                result_count = min(len(filtered_properties), 6)
-                explanation = AIPropertySearch._generate_explanation(criteria, len(filtered_properties))
+            if len(ranked):
+                explanation = AIPropertySearch._generate_explanation(criteria, len(ranked))
 
                 return {
-                    'properties': filtered_properties[:result_count],
+                    # Only the top results are materialized
+                    'properties': [available_properties[i] for i in ranked[:6]],
                     'explanation': explanation,
                     'ai_powered': True
                 }
@@ -93,238 +265,146 @@ class AIPropertySearch:
             }
 
     @staticmethod
-    def _extract_criteria_with_ai(query: str, properties: List[Dict]) -> Dict:
+    def _extract_criteria_with_ai(query: str) -> Dict:
         """Use Gemini AI to extract search criteria from natural language query"""
         
-        prices = [p.get('harga') for p in properties if p.get('harga') is not None and p.get('harga') > 0]
-        
-        property_schema = {
-            "fields": [
-                "judul_properti", "kelurahan", "kecamatan", "alamat", "deskripsi",
-                "luas_tanah", "luas_bangunan", "kamar_tidur", "kamar_mandi", "carport",
-                "tahun_dibangun", "lantai", "harga", "jarak_sekolah", "jarak_rs", "jarak_pasar",
-                "jenis_jalan", "kondisi", "sertifikat"
-            ],
-            "sample_locations": {
-                "kelurahan": ["Sukaraja", "Majasari", "Gunung Ibul", "Patih Galung", "Wonosari", 
-                             "Gunung Kemala", "Sukajadi", "Karang Bindu", "Tanjung Telang", 
-                             "Tanjung Raman", "Cambai", "Muara Dua", "Anak Petai", "Pangkul",
-                             "Karang Jaya", "Gunung Ibul Barat", "Mangga"],
-                "kecamatan": ["Prabumulih Selatan", "Prabumulih Timur", "Prabumulih Barat",
-                             "Prabumulih Utara", "Cambai", "Rambang Kapak Tengah"]
-            },
-            "price_range": {
-                "min": min(prices) if prices else 0,
-                "max": max(prices) if prices else 0,
-                "avg": sum(prices) / len(prices) if prices else 0
-            }
-        }
-
-        prompt = f"""Anda adalah asisten AI untuk sistem pencarian properti rumah. Tugas Anda adalah menganalisis pertanyaan pengguna dan mengekstrak kriteria pencarian.
-
-Database Properties memiliki field berikut:
-{json.dumps(property_schema['fields'], indent=2)}
-
-Lokasi yang tersedia:
-Kelurahan: {', '.join(property_schema['sample_locations']['kelurahan'])}
-Kecamatan: {', '.join(property_schema['sample_locations']['kecamatan'])}
-
-Range Harga:
-- Minimum: Rp {property_schema['price_range']['min']:,.0f}
-- Maximum: Rp {property_schema['price_range']['max']:,.0f}
-- Rata-rata: Rp {property_schema['price_range']['avg']:,.0f}
-
-Pertanyaan pengguna: "{query}"
+        stats = PropertyRepository.price_stats()
+        price_range = (stats['min'], stats['max'], stats['avg'])
+        # Whitespace/case-insensitive key so repeated searches reuse the cached Gemini reply;
+        # the prompt itself still gets the user's original text
+        key = (' '.join(query.lower().split()), price_range)
 
-Ekstrak kriteria pencarian dari pertanyaan di atas dan berikan dalam format JSON berikut:
-{{
-  "budget_min": <angka atau null>,
-  "budget_max": <angka atau null>,
-  "kamar_tidur": <angka atau null>,
-  "kamar_mandi": <angka atau null>,
-  "kelurahan": <string atau null>,
-  "kecamatan": <string atau null>,
-  "luas_tanah_min": <angka atau null>,
-  "luas_bangunan_min": <angka atau null>,
-  "kondisi": <"baik" atau "sedang" atau "kurang" atau null>,
-  "sertifikat": <"SHM" atau "HGB" atau null>,
-  "carport": <angka atau null>,
-  "jarak_sekolah_max": <angka dalam meter atau null>,
-  "jarak_rs_max": <angka dalam meter atau null>,
-  "jarak_pasar_max": <angka dalam meter atau null>,
-  "price_preference": <"low" untuk murah, "high" untuk mahal, atau null>,
-  "search_keywords": [<array kata kunci dari deskripsi/alamat yang dicari>]
-}}
-
-Panduan:
-- Jika pengguna menyebut "200 jutaan" atau "200 juta", set budget_min=140000000, budget_max=260000000 (±30%)
-- Jika pengguna menyebut "milyar" atau "M", kalikan dengan 1000000000
-- Jika pengguna menyebut lokasi spesifik, cari di kelurahan/kecamatan
-- Jika pengguna menyebut "dekat sekolah/rumah sakit/pasar", set jarak maksimal (contoh: 1000 meter)
-- Jika pengguna minta "murah" atau "termurah", set price_preference="low"
-- Jika pengguna minta "mewah" atau "mahal", set price_preference="high"
-- Ekstrak kata kunci penting untuk mencari di deskripsi/alamat (contoh: "citymall", "dekat", dll)
+        try:
+            with _criteria_reply_lock:
+                response_text = _criteria_reply_cache.get(key)
+            if response_text is None:
+                response_text = AIPropertySearch._request_criteria_json(query, price_range)
+                with _criteria_reply_lock:
+                    if len(_criteria_reply_cache) >= _CRITERIA_REPLY_CACHE_SIZE:
+                        del _criteria_reply_cache[next(iter(_criteria_reply_cache))]
+                    _criteria_reply_cache[key] = response_text
+            return loads_json(response_text)
+        except Exception as e:
+            print(f"Error extracting criteria with AI: {str(e)}")
+            return {}
 
-Hanya berikan JSON, tanpa penjelasan tambahan."""
+    @staticmethod
+    def _request_criteria_json(query: str, price_range: Tuple[float, float, float]) -> str:
+        """Ask Gemini for search criteria as JSON text (failures raise, so they are never cached)"""
+        
+        prompt = (
+            f"{_CRITERIA_PROMPT_PREFIX}"
+            f"Range Harga:\n"
+            f"- Minimum: Rp {price_range[0]:,.0f}\n"
+            f"- Maximum: Rp {price_range[1]:,.0f}\n"
+            f"- Rata-rata: Rp {price_range[2]:,.0f}\n\n"
+            f"Pertanyaan pengguna: \"{query}\"\n\n"
+            f"{_CRITERIA_PROMPT_SUFFIX}"
+        )
 
         max_retries = 3
         base_delay = 1
+        # Give up once backing off would hold the worker past the retry budget
+        deadline = time.monotonic() + Config.GEMINI_RETRY_BUDGET
         
         for attempt in range(max_retries):
             try:
                 response = client.models.generate_content(
-                    model="gemini-2.0-flash-exp",
-                    contents=prompt
+                    model=Config.GEMINI_MODEL,
+                    contents=prompt,
+                    config=criteria_config
                 )
                 
-                response_text = response.text.strip()
+                response_text = response.text
                 
-                if response_text.startswith('```json'):
-                    response_text = response_text[7:]
-                if response_text.startswith('```'):
-                    response_text = response_text[3:]
-                if response_text.endswith('```'):
-                    response_text = response_text[:-3]
-                
-                response_text = response_text.strip()
-                
-                criteria = json.loads(response_text)
-                return criteria
+                # Validate before returning so malformed replies are never cached
+                loads_json(response_text)
+                return response_text
 
             except Exception as e:
                 error_msg = str(e).lower()
-                if ('503' in str(e) or 'overloaded' in error_msg or 'unavailable' in error_msg) and attempt < max_retries - 1:
-                    wait_time = min(base_delay * (2 ** attempt), 32)
-                    jitter = random.uniform(0, 1)
-                    sleep_time = wait_time + jitter
+                overloaded = '503' in str(e) or 'overloaded' in error_msg or 'unavailable' in error_msg
+                wait_time = min(base_delay * (2 ** attempt), 32)
+                sleep_time = wait_time + random.random()
+                if overloaded and attempt < max_retries - 1 and time.monotonic() + sleep_time < deadline:
                     print(f"Gemini API overloaded (503). Retry {attempt + 1}/{max_retries} in {sleep_time:.1f}s...")
                     time.sleep(sleep_time)
-                elif attempt == max_retries - 1:
-                    print(f"Error extracting criteria with AI after {max_retries} retries: {str(e)}")
-                    return {}
                 else:
-                    print(f"Error extracting criteria with AI: {str(e)}")
-                    return {}
+                    raise
 
     @staticmethod
-    def _filter_properties_with_criteria(properties: List[Dict], criteria: Dict) -> List[Dict]:
-        """Filter and score properties based on AI-extracted criteria"""
+    def _rank_properties(properties: List[Dict], criteria: Dict) -> np.ndarray:
+        """Indices of the properties matching AI-extracted criteria, best first"""
         
-        if not criteria:
-            return properties
-
-        scored_properties = []
+        if not criteria or not properties:
+            return np.arange(len(properties))
 
-        for prop in properties:
-            score = 0.0
-            passes_hard_filters = True
+        cols = _search_columns(properties)
+        score = np.zeros(len(properties))
+        passes_hard_filters = np.ones(len(properties), dtype=bool)
 
+        with np.errstate(invalid='ignore', divide='ignore'):
             if criteria.get('budget_min') is not None and criteria.get('budget_max') is not None:
-                prop_price = prop.get('harga')
-                if prop_price is None or prop_price <= 0:
-                    passes_hard_filters = False
-                elif prop_price < criteria['budget_min'] or prop_price > criteria['budget_max']:
-                    passes_hard_filters = False
-                else:
-                    budget_center = (criteria['budget_min'] + criteria['budget_max']) / 2
-                    price_diff = abs(prop_price - budget_center) / budget_center
-                    if price_diff <= 0.1:
-                        score += 40
-                    elif price_diff <= 0.3:
-                        score += 30
-                    elif price_diff <= 0.5:
-                        score += 20
-                    else:
-                        score += 10
-
-            if criteria.get('kamar_tidur') is not None:
-                prop_rooms = prop.get('kamar_tidur', 0)
-                required_rooms = criteria['kamar_tidur']
-                if prop_rooms == required_rooms:
-                    score += 25
-                elif abs(prop_rooms - required_rooms) == 1:
-                    score += 12
-
-            if criteria.get('kamar_mandi') is not None:
-                prop_bathrooms = prop.get('kamar_mandi', 0)
-                required_bathrooms = criteria['kamar_mandi']
-                if prop_bathrooms == required_bathrooms:
-                    score += 15
-                elif abs(prop_bathrooms - required_bathrooms) == 1:
-                    score += 7
-
-            if criteria.get('kelurahan'):
-                prop_kelurahan = prop.get('kelurahan', '').lower().strip()
-                criteria_kelurahan = criteria['kelurahan'].lower().strip()
-                if criteria_kelurahan in prop_kelurahan or prop_kelurahan in criteria_kelurahan:
-                    score += 20
-
-            if criteria.get('kecamatan'):
-                prop_kecamatan = prop.get('kecamatan', '').lower().strip()
-                criteria_kecamatan = criteria['kecamatan'].lower().strip()
-                if criteria_kecamatan in prop_kecamatan or prop_kecamatan in criteria_kecamatan:
-                    score += 20
-
-            if criteria.get('luas_tanah_min') is not None:
-                prop_luas = prop.get('luas_tanah', 0)
-                if prop_luas >= criteria['luas_tanah_min']:
-                    score += 10
-
-            if criteria.get('luas_bangunan_min') is not None:
-                prop_luas = prop.get('luas_bangunan', 0)
-                if prop_luas >= criteria['luas_bangunan_min']:
-                    score += 10
+                harga = cols['harga']
+                in_budget = (harga > 0) & (harga >= criteria['budget_min']) & (harga <= criteria['budget_max'])
+                passes_hard_filters = in_budget
+                # Rows outside the budget earn no budget points, so only rate the ones inside it.
+                # They are not dropped: other criteria can still make them candidates.
+                rows = np.flatnonzero(in_budget)
+                budget_center = (criteria['budget_min'] + criteria['budget_max']) / 2
+                price_diff = np.abs(harga[rows] - budget_center) / budget_center
+                score[rows] += np.select([price_diff <= 0.1, price_diff <= 0.3, price_diff <= 0.5], [40, 30, 20], 10)
+
+            for field, exact_points, near_points in (('kamar_tidur', 25, 12), ('kamar_mandi', 15, 7)):
+                if criteria.get(field) is not None:
+                    values = cols[field]
+                    required = criteria[field]
+                    score += np.where(values == required, exact_points,
+                                      np.where(np.abs(values - required) == 1, near_points, 0))
+
+            for field in ('kelurahan', 'kecamatan'):
+                if criteria.get(field):
+                    values = cols[field]
+                    wanted = criteria[field].lower().strip()
+                    # Match either way round, e.g. "Gunung Ibul" vs "Gunung Ibul Barat"
+                    matches = (np.strings.find(values, wanted) >= 0) | (np.strings.find(wanted, values) >= 0)
+                    score += 20 * matches
+
+            for field in ('luas_tanah', 'luas_bangunan'):
+                if criteria.get(f'{field}_min') is not None:
+                    score += 10 * (cols[field] >= criteria[f'{field}_min'])
 
             if criteria.get('kondisi'):
-                if prop.get('kondisi', '').lower() == criteria['kondisi'].lower():
-                    score += 10
+                score += 10 * (cols['kondisi'] == criteria['kondisi'].lower())
 
             if criteria.get('sertifikat'):
-                if prop.get('sertifikat', '').upper() == criteria['sertifikat'].upper():
-                    score += 10
+                score += 10 * (cols['sertifikat'] == criteria['sertifikat'].upper())
 
             if criteria.get('carport') is not None:
-                if prop.get('carport', 0) >= criteria['carport']:
-                    score += 5
-
-            if criteria.get('jarak_sekolah_max') is not None:
-                prop_jarak = prop.get('jarak_sekolah', 999999)
-                if prop_jarak <= criteria['jarak_sekolah_max']:
-                    score += 10
+                score += 5 * (cols['carport'] >= criteria['carport'])
 
-            if criteria.get('jarak_rs_max') is not None:
-                prop_jarak = prop.get('jarak_rs', 999999)
-                if prop_jarak <= criteria['jarak_rs_max']:
-                    score += 10
-
-            if criteria.get('jarak_pasar_max') is not None:
-                prop_jarak = prop.get('jarak_pasar', 999999)
-                if prop_jarak <= criteria['jarak_pasar_max']:
-                    score += 10
+            for field in ('jarak_sekolah', 'jarak_rs', 'jarak_pasar'):
+                if criteria.get(f'{field}_max') is not None:
+                    score += 10 * (cols[field] <= criteria[f'{field}_max'])
 
             if criteria.get('search_keywords'):
-                keywords = criteria['search_keywords']
-                prop_text = f"{prop.get('judul_properti', '')} {prop.get('deskripsi', '')} {prop.get('alamat', '')}".lower()
-                for keyword in keywords:
-                    if keyword.lower() in prop_text:
-                        score += 15
-
-            if passes_hard_filters or score > 0:
-                scored_properties.append({
-                    'property': prop,
-                    'score': score
-                })
+                text = cols['search_text']
+                # One scan per distinct keyword; repeats still add 15 points each
+                keyword_counts = Counter(keyword.lower() for keyword in criteria['search_keywords'])
+                for keyword, count in keyword_counts.items():
+                    score += 15 * count * (np.strings.find(text, keyword) >= 0)
 
-        scored_properties.sort(key=lambda x: x['score'], reverse=True)
-        filtered = [item['property'] for item in scored_properties]
+        candidates = np.nonzero(passes_hard_filters | (score > 0))[0]
 
-        if criteria.get('price_preference'):
-            if criteria['price_preference'] == 'low':
-                filtered.sort(key=lambda p: p['harga'] if p.get('harga') is not None else float('inf'))
-            elif criteria['price_preference'] == 'high':
-                filtered.sort(key=lambda p: p['harga'] if p.get('harga') is not None else 0, reverse=True)
+        # One lexsort (last key is primary): price preference if any, then score, then catalog order
+        sort_keys = [candidates, -score[candidates]]
+        harga = cols['harga'][candidates]
+        if criteria.get('price_preference') == 'low':
+            sort_keys.append(np.where(np.isnan(harga), np.inf, harga))
+        elif criteria.get('price_preference') == 'high':
+            sort_keys.append(-np.where(np.isnan(harga), 0, harga))
 
-        return filtered
+        return candidates[np.lexsort(sort_keys)]
 
     @staticmethod
     def _generate_explanation(criteria: Dict, total_found: int) -> str:
@@ -333,24 +413,14 @@ Hanya berikan JSON, tanpa penjelasan tambahan."""
 
         if criteria.get('budget_min') and criteria.get('budget_max'):
             avg_budget = (criteria['budget_min'] + criteria['budget_max']) / 2
-            parts.append(f"budget sekitar Rp {avg_budget:,.0f}".replace(',', '.'))
-
-        if criteria.get('kamar_tidur'):
-            parts.append(f"{criteria['kamar_tidur']} kamar tidur")
-
-        if criteria.get('kamar_mandi'):
-            parts.append(f"{criteria['kamar_mandi']} kamar mandi")
-
-        if criteria.get('kelurahan'):
-            parts.append(f"di kelurahan {criteria['kelurahan']}")
-        elif criteria.get('kecamatan'):
-            parts.append(f"di kecamatan {criteria['kecamatan']}")
+            parts.append(f"budget sekitar {format_rupiah(avg_budget)}")
 
-        if criteria.get('kondisi'):
-            parts.append(f"kondisi {criteria['kondisi']}")
-
-        if criteria.get('jarak_sekolah_max'):
-            parts.append(f"dekat sekolah (< {criteria['jarak_sekolah_max']}m)")
+        for alternatives in _EXPLANATION_TEMPLATES:
+            for field, template in alternatives:
+                value = criteria.get(field)
+                if value:
+                    parts.append(template(value))
+                    break
 
         if criteria.get('search_keywords'):
             keywords_str = ', '.join(criteria['search_keywords'][:3])
@@ -363,19 +433,16 @@ Hanya berikan JSON, tanpa penjelasan tambahan."""
             return f"Ditemukan {total_found} properti berdasarkan pencarian Anda. Menampilkan {min(total_found, 6)} properti teratas."
 
 
-def gemini_chat_response(message: str, context: Optional[str] = None) -> str:
-    """Generate chatbot response using Gemini AI"""
-    if not GEMINI_AVAILABLE or not client:
-        return "Maaf, layanan chatbot AI sedang tidak tersedia. Silakan hubungi admin untuk mengkonfigurasi GEMINI_API_KEY."
+# (price stats, chat config) for the last catalog summary; stats are a new dict per file version
+_chat_config_cache: Dict = {'entry': None}
 
-    try:
-        properties = PropertyRepository.load_properties()
-        property_context = f"Available properties count: {len(properties)}"
-        if properties:
-            prices = [float(p.get('harga', 0)) for p in properties if p.get('harga')]
-            if prices:
-                avg_price = sum(prices) / len(prices)
-                property_context += f", Average price: Rp {avg_price:,.0f}"
+def _chat_config(stats: Dict) -> 'types.GenerateContentConfig':
+    """Chat request config carrying the system prompt, rebuilt only when the catalog summary changes"""
+    entry = _chat_config_cache['entry']
+    if entry is None or entry[0] is not stats:
+        property_context = f"Available properties count: {stats['catalog_count']}"
+        if stats['catalog_avg'] is not None:
+            property_context += f", Average price: Rp {stats['catalog_avg']:,.0f}"
 
         system_prompt = f"""You are a helpful real estate assistant for a property recommendation system. 
         Context: {property_context}
@@ -388,11 +455,22 @@ def gemini_chat_response(message: str, context: Optional[str] = None) -> str:
 
         Be friendly, informative, and helpful. Respond in Bahasa Indonesia when appropriate."""
 
+        entry = (stats, types.GenerateContentConfig(system_instruction=system_prompt))
+        _chat_config_cache['entry'] = entry
+    return entry[1]
+
+def gemini_chat_response(message: str, context: Optional[str] = None) -> str:
+    """Generate chatbot response using Gemini AI"""
+    if not GEMINI_AVAILABLE or not client:
+        return "Maaf, layanan chatbot AI sedang tidak tersedia. Silakan hubungi admin untuk mengkonfigurasi GEMINI_API_KEY."
+
+    try:
+        # The system prompt travels as system_instruction; only the user's message is content.
+        # A plain string is sent as a single user turn, same as the criteria request's prompt.
         response = client.models.generate_content(
-            model="gemini-2.0-flash-exp",
-            contents=[
-                types.Content(role="user", parts=[types.Part(text=f"{system_prompt}\n\nUser question: {message}")])
-            ]
+            model=Config.GEMINI_MODEL,
+            contents=message,
+            config=_chat_config(PropertyRepository.price_stats())
         )
 
         return response.text if response.text else "Maaf, saya tidak dapat memproses pertanyaan Anda saat ini."
@@ -4,11 +4,31 @@ from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, r2_score
-import pickle
+import atexit
+import joblib
+import os
+import tempfile
+import threading
+from bisect import bisect_left
 from typing import Optional, Dict, Any
 from app.models import PropertyRepository, BasePriceRepository, encode_categorical
 from app.config import Config
 
+# Base price age brackets, one multiplier lookup instead of an if/elif ladder:
+# 0-5 years: 100% value, 6-10: 95%, 11-15: 90%, 16-20: 85%, >20: 80%
+_AGE_BRACKET_LIMITS = (5, 10, 15, 20)
+_AGE_MULTIPLIERS = (1.0, 0.95, 0.90, 0.85, 0.80)
+
+# Training inputs filled in with these values when a property lacks the field
+_INT_FEATURE_DEFAULTS = {'kamar_tidur': 2, 'kamar_mandi': 1, 'carport': 0, 'tahun_dibangun': 2020, 'lantai': 1}
+_FLOAT_FEATURE_DEFAULTS = {'jarak_sekolah': 1000, 'jarak_rs': 2000, 'jarak_pasar': 1500}
+# Categorical fields and their encodings; unknown or missing values encode as 0
+_CATEGORICAL_FEATURES = (
+    ('jenis_jalan', Config.JENIS_JALAN_MAP),
+    ('kondisi', Config.KONDISI_MAP),
+    ('sertifikat', Config.SERTIFIKAT_MAP)
+)
+
 class MLPredictionService:
     """Machine Learning service for property price prediction"""
     
@@ -16,6 +36,14 @@ class MLPredictionService:
         self.model: Optional[RandomForestRegressor] = None
         self.scaler: Optional[StandardScaler] = None
         self.feature_columns = Config.FEATURE_COLUMNS
+        self._load_lock = threading.Lock()
+        # Background retraining state (see schedule_training)
+        self._train_lock = threading.Lock()
+        self._train_timer: Optional[threading.Timer] = None
+        self._training = False
+        self._retrain_pending = False
+        # A retrain still waiting on its timer runs before the process exits instead of being lost
+        atexit.register(self._flush_scheduled_training)
     
     def prepare_ml_data(self) -> Optional[pd.DataFrame]:
         """Prepare data for machine learning"""
@@ -23,35 +51,40 @@ class MLPredictionService:
         if len(properties) < 5:  # Need minimum data for training
             return None
         
-        # Prepare dataset
-        data = []
-        for prop in properties:
-            if prop.get('harga') and all(key in prop for key in ['luas_tanah', 'luas_bangunan']):
-                row = [
-                    float(prop['luas_tanah']),
-                    float(prop['luas_bangunan']),
-                    int(prop.get('kamar_tidur', 2)),
-                    int(prop.get('kamar_mandi', 1)),
-                    int(prop.get('carport', 0)),
-                    int(prop.get('tahun_dibangun', 2020)),
-                    int(prop.get('lantai', 1)),
-                    float(prop.get('jarak_sekolah', 1000)),
-                    float(prop.get('jarak_rs', 2000)),
-                    float(prop.get('jarak_pasar', 1500)),
-                    encode_categorical(prop.get('jenis_jalan'), Config.JENIS_JALAN_MAP),
-                    encode_categorical(prop.get('kondisi'), Config.KONDISI_MAP),
-                    encode_categorical(prop.get('sertifikat'), Config.SERTIFIKAT_MAP),
-                    float(prop['harga'])
-                ]
-                data.append(row)
-        
-        if len(data) < 5:
+        # Prepare dataset: pick the training rows, then cast and encode column by column
+        rows = [prop for prop in properties if self.is_training_row(prop)]
+        if len(rows) < 5:
             return None
-            
-        columns = self.feature_columns + ['harga']
-        df = pd.DataFrame(data, columns=columns)
+        
+        raw = pd.DataFrame(rows, columns=list(Config.TRAINING_FIELDS))
+        columns = {
+            'luas_tanah': raw['luas_tanah'].astype(np.float64),
+            'luas_bangunan': raw['luas_bangunan'].astype(np.float64)
+        }
+        for field, default in _INT_FEATURE_DEFAULTS.items():
+            # Through float first so numeric strings and floats truncate like int()
+            columns[field] = raw[field].fillna(default).astype(np.float64).astype(np.int64)
+        for field, default in _FLOAT_FEATURE_DEFAULTS.items():
+            columns[field] = raw[field].fillna(default).astype(np.float64)
+        for field, mapping in _CATEGORICAL_FEATURES:
+            columns[f'{field}_encoded'] = raw[field].map(mapping).fillna(0).astype(np.int64)
+        columns['harga'] = raw['harga'].astype(np.float64)
+        
+        df = pd.DataFrame(columns)[self.feature_columns + ['harga']]
         return df
     
+    @staticmethod
+    def is_training_row(prop: Dict[str, Any]) -> bool:
+        """Whether prepare_ml_data would use this property as a training row"""
+        return bool(prop.get('harga')) and all(key in prop for key in ['luas_tanah', 'luas_bangunan'])
+    
+    @staticmethod
+    def training_signature(prop: Dict[str, Any]) -> Optional[tuple]:
+        """Values a property contributes to training, or None if it is not a training row"""
+        if not MLPredictionService.is_training_row(prop):
+            return None
+        return tuple(prop.get(key) for key in Config.TRAINING_FIELDS)
+    
     def train_model(self) -> bool:
         """Train the machine learning model"""
         df = self.prepare_ml_data()
@@ -63,29 +96,91 @@ class MLPredictionService:
         y = df['harga']
         
         # Scale features
-        self.scaler = StandardScaler()
-        X_scaled = self.scaler.fit_transform(X)
+        scaler = StandardScaler()
+        X_scaled = scaler.fit_transform(X)
         
         # Train model
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
-        self.model.fit(X_scaled, y)
+        model = RandomForestRegressor(n_estimators=100, random_state=42)
+        model.fit(X_scaled, y)
+        
+        # Swap both at once so concurrent predictions never mix old and new
+        self.model, self.scaler = model, scaler
         
-        # Save model
+        # Write a new file and swap it in so a concurrent load never reads a half-written model
         try:
-            with open('models/price_model.pkl', 'wb') as f:
-                pickle.dump({'model': self.model, 'scaler': self.scaler}, f)
+            fd, tmp_path = tempfile.mkstemp(dir='models', suffix='.tmp')
+            os.close(fd)
+            try:
+                joblib.dump({'model': model, 'scaler': scaler}, tmp_path)
+                os.replace(tmp_path, 'models/price_model.pkl')
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
             return True
         except Exception as e:
             print(f"Error saving model: {e}")
             return False
     
+    def schedule_training(self, delay: Optional[float] = None) -> None:
+        """Retrain the model on a background thread once edits go quiet.
+        
+        Each call (re)starts a timer, so a burst of admin edits triggers a single
+        training run `delay` seconds after the last one. If the timer fires while
+        a run is in progress, one more run is queued to pick up the latest data.
+        """
+        if delay is None:
+            delay = Config.ML_RETRAIN_DELAY
+        with self._train_lock:
+            if self._train_timer is not None:
+                self._train_timer.cancel()
+            self._train_timer = threading.Timer(delay, self._run_scheduled_training)
+            self._train_timer.daemon = True
+            self._train_timer.start()
+    
+    def _run_scheduled_training(self) -> None:
+        """Timer callback: run train_model until no further retrain has been requested"""
+        with self._train_lock:
+            self._train_timer = None
+            if self._training:
+                self._retrain_pending = True
+                return
+            self._training = True
+        while True:
+            try:
+                self.train_model()
+            except Exception as e:
+                print(f"Error training model: {e}")
+            with self._train_lock:
+                if not self._retrain_pending:
+                    self._training = False
+                    return
+                self._retrain_pending = False
+    
+    def _flush_scheduled_training(self) -> None:
+        """Run a retrain whose timer has not fired yet (called at exit)"""
+        with self._train_lock:
+            timer = self._train_timer
+            if timer is None:
+                return
+            timer.cancel()
+        self._run_scheduled_training()
+    
+    @staticmethod
+    def _model_is_stale() -> bool:
+        """True when properties.json changed after the saved model was trained"""
+        try:
+            return os.path.getmtime('data/properties.json') > os.path.getmtime('models/price_model.pkl')
+        except FileNotFoundError:
+            return False
+    
     def load_model(self) -> bool:
-        """Load the trained ML model"""
+        """Load the trained ML model, retraining first if the data is newer than the saved model"""
+        # Covers retrains that were scheduled but never ran (e.g. the worker exited first)
+        if self._model_is_stale() and self.train_model():
+            return True
         try:
-            with open('models/price_model.pkl', 'rb') as f:
-                model_data = pickle.load(f)
-                self.model = model_data['model']
-                self.scaler = model_data['scaler']
+            model_data = joblib.load('models/price_model.pkl')
+            self.model, self.scaler = model_data['model'], model_data['scaler']
             return True
         except FileNotFoundError:
             return self.train_model()
@@ -102,8 +197,10 @@ class MLPredictionService:
     def _get_ml_prediction(self, property_data: Dict[str, Any]) -> Optional[float]:
         """Get ML model prediction"""
         if self.model is None:
-            if not self.load_model():
-                return None
+            # Only the first request loads; concurrent ones wait instead of loading again
+            with self._load_lock:
+                if self.model is None and not self.load_model():
+                    return None
         
         # Prepare input data
         tahun_dibangun = int(property_data.get('tahun_dibangun', 2020))
@@ -127,10 +224,13 @@ class MLPredictionService:
         print(f"Debug ML - Year built feature: {tahun_dibangun}")
         
         # Scale and predict
-        if self.scaler is not None and self.model is not None:
+        model, scaler = self.model, self.scaler
+        if scaler is not None and model is not None:
             try:
-                features_scaled = self.scaler.transform([features])
-                prediction = self.model.predict(features_scaled)[0]
+                # StandardScaler.transform's arithmetic without its per-call input validation.
+                # The forest walks its trees on float32 input, so hand it float32 and skip its copy.
+                features_scaled = ((np.array([features], dtype=np.float64) - scaler.mean_) / scaler.scale_).astype(np.float32)
+                prediction = model.predict(features_scaled)[0]
                 return max(0, prediction)
             except Exception as e:
                 print(f"Error predicting price: {e}")
@@ -162,22 +262,8 @@ class MLPredictionService:
             current_year = 2025
             building_age = current_year - tahun_dibangun
             
-            # Age multiplier: newer = higher value, older = lower value
-            # Buildings 0-5 years: 100% value
-            # Buildings 6-10 years: 95% value  
-            # Buildings 11-15 years: 90% value
-            # Buildings 16-20 years: 85% value
-            # Buildings >20 years: 80% value
-            if building_age <= 5:
-                age_multiplier = 1.0
-            elif building_age <= 10:
-                age_multiplier = 0.95
-            elif building_age <= 15:
-                age_multiplier = 0.90
-            elif building_age <= 20:
-                age_multiplier = 0.85
-            else:
-                age_multiplier = 0.80
+            # Age multiplier: newer = higher value, older = lower value (see _AGE_MULTIPLIERS)
+            age_multiplier = _AGE_MULTIPLIERS[bisect_left(_AGE_BRACKET_LIMITS, building_age)]
             
             print(f"Debug - Year built: {tahun_dibangun}, Age: {building_age}, Age multiplier: {age_multiplier}")
             
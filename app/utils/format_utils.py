@@ -0,0 +1,11 @@
+# Indonesian thousands separator: 1,250,000 -> 1.250.000
+_THOUSANDS_DOT = str.maketrans(',', '.')
+
+def format_rupiah(amount):
+    """Format an amount as Rupiah without decimals, e.g. Rp 1.250.000"""
+    return f"Rp {amount:,.0f}".translate(_THOUSANDS_DOT)
+
+# Deletes every Latin-1 codepoint except ASCII 0-9, for stripping prices and phone numbers
+# down to their digits in one str.translate pass instead of the regex engine. Codepoints
+# beyond Latin-1 survive it, so callers check isascii() and clean those up themselves.
+NON_DIGITS = str.maketrans("", "", (bytes(range(48)) + bytes(range(58, 256))).decode("latin-1"))
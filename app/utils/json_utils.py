@@ -0,0 +1,62 @@
+"""
+JSON helpers backed by orjson
+"""
+import os
+import stat
+import tempfile
+from typing import Any, Union
+import orjson
+from flask.json.provider import DefaultJSONProvider
+
+# Process umask, read once at import: os.umask can only be read by setting it,
+# which is not safe once request threads are running
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+class ORJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson instead of the stdlib json module"""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize data as JSON, keeping Flask's key sorting and fallback encoders"""
+        # Datetimes go through Flask's default encoder so the output format stays unchanged
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode()
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        """Deserialize JSON from a string or UTF-8 bytes"""
+        return orjson.loads(s)
+
+def loads_json(s: Union[str, bytes]) -> Any:
+    """Parse JSON from a string or UTF-8 bytes"""
+    return orjson.loads(s)
+
+def read_json_file(path: str) -> Any:
+    """Parse a JSON file"""
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
+def write_json_file(path: str, data: Any) -> None:
+    """Write data to a file as JSON indented by two spaces.
+
+    The JSON goes to a temporary file in the same directory that then replaces
+    path, so readers never see a partially written file.
+    """
+    payload = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+        # mkstemp creates the file 0o600: keep the replaced file's mode, or what open() would give a new one
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
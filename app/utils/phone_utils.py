@@ -1,6 +1,9 @@
 import re
+from functools import lru_cache
 from urllib.parse import quote_plus
+from app.utils.format_utils import NON_DIGITS
 
+@lru_cache(maxsize=4096)
 def normalize_indonesian_phone(phone_number):
     """
     Normalize Indonesian phone numbers for WhatsApp links
@@ -10,22 +13,26 @@ def normalize_indonesian_phone(phone_number):
         return None
     
     # Remove all non-digit characters
-    clean_number = re.sub(r'\D', '', phone_number)
+    clean_number = phone_number.translate(NON_DIGITS)
+    if not clean_number.isascii():
+        # Rare: codepoints beyond Latin-1 survive the table, let the regex decide
+        clean_number = re.sub(r'\D', '', clean_number)
     
     if not clean_number:
         return None
     
-    # Handle different formats
-    if clean_number.startswith('62'):
-        # Already in international format
+    # Handle different formats: already international (62xxx) is kept as is,
+    # local format (08xxx) drops its leading 0, anything else just gets the country code
+    if clean_number[:2] == '62':
         return clean_number
-    elif clean_number.startswith('0'):
-        # Local format (08xxx) -> convert to international (62xxx)
-        return '62' + clean_number[1:]
-    else:
-        # Assume it's missing the country code and leading 0
-        return '62' + clean_number
+    return '62' + (clean_number[1:] if clean_number[0] == '0' else clean_number)
     
+# URL-encoded fixed parts of the WhatsApp message, encoded once at import
+_MESSAGE_PREFIX = quote_plus("Halo ")
+_MESSAGE_MIDDLE = quote_plus(", saya tertarik dengan properti ")
+_MESSAGE_SUFFIX = quote_plus(" yang sedang dijual. Bisa kita diskusi lebih lanjut?")
+
+@lru_cache(maxsize=8192)
 def create_whatsapp_link(phone_number, seller_name, property_title):
     """
     Create a properly formatted WhatsApp link with normalized phone and encoded message
@@ -35,13 +42,15 @@ def create_whatsapp_link(phone_number, seller_name, property_title):
     if not normalized_phone:
         return None
     
-    # Create message text
-    message = f"Halo {seller_name or 'Penjual'}, saya tertarik dengan properti {property_title} yang sedang dijual. Bisa kita diskusi lebih lanjut?"
-    
-    # URL encode the message
-    encoded_message = quote_plus(message)
+    # Encode only the seller and title; quote_plus works per character, so the
+    # pieces join into the same text as encoding the whole message
+    encoded_message = (
+        _MESSAGE_PREFIX + quote_plus(str(seller_name or 'Penjual'))
+        + _MESSAGE_MIDDLE + quote_plus(str(property_title))
+        + _MESSAGE_SUFFIX
+    )
     
     # Create WhatsApp link
     whatsapp_link = f"https://wa.me/{normalized_phone}?text={encoded_message}"
     
-    return whatsapp_link
\ No newline at end of file
+    return whatsapp_link
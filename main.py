@@ -2,12 +2,15 @@
 Main application entry point using Flask app factory pattern
 """
 from app import create_app
+from app.config import Config
 from app.services.ml_service import ml_service
 
 # Create Flask application
 app = create_app()
 
+# Initialize ML model at import so under any server (gunicorn included) the first prediction
+# does not pay for loading it
+ml_service.load_model()
+
 if __name__ == '__main__':
-    # Initialize ML model on startup
-    ml_service.load_model()
-    app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000, debug=Config.DEBUG)